@@ -2,44 +2,157 @@ import os
 import sys
 import json
 import time
+import queue
 import signal
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Callable, Iterator, Optional, TextIO
 
-from openai import OpenAI
 from colorama import Fore, Style, init as colorama_init
 
 from settings import PROJECT_ROOT, LOGS_DIR, load_config, get_api_key
-from memory_store import MemoryStore
+from memory_store import MemoryStore, merge_memory
+from openai_client import get_openai_client
 
 colorama_init(autoreset=True)
 
+# Seconds to wait on exit for a background memory summary to finish
+SUMMARY_WAIT_TIMEOUT = 30
+SUMMARY_THREAD_PREFIX = 'memory-summary'
+
+
+class _DeferredLogHandler(logging.Handler):
+    """Hold memory-store warnings from summary worker threads until the chat loop reports them.
+    
+    Records from any other thread go to logging's last-resort handler, as they
+    would without this handler installed.
+    """
+    def __init__(self):
+        super().__init__(logging.WARNING)
+        self.records: deque = deque()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if record.threadName.startswith(SUMMARY_THREAD_PREFIX):
+            self.records.append(record)
+        elif not logging.root.handlers and logging.lastResort is not None:
+            logging.lastResort.handle(record)
+
+
+class _SummaryWorker:
+    """Run summary jobs one at a time, in submission order, on a daemon thread.
+    
+    ThreadPoolExecutor workers are joined at interpreter exit, so a summary
+    still running after SUMMARY_WAIT_TIMEOUT would hold the process open. A
+    daemon thread is simply abandoned; memory files are swapped in with
+    os.replace, so an abandoned save never leaves a partial file.
+    """
+    def __init__(self):
+        self._jobs: queue.SimpleQueue = queue.SimpleQueue()
+        threading.Thread(target=self._run, name=f"{SUMMARY_THREAD_PREFIX}_0", daemon=True).start()
+
+    def submit(self, fn: Callable[..., Any], *args: Any) -> Future:
+        future: Future = Future()
+        self._jobs.put((future, fn, args))
+        return future
+
+    def shutdown(self) -> None:
+        """Cancel queued jobs and stop the thread once the running job (if any) returns."""
+        try:
+            while True:
+                job = self._jobs.get_nowait()
+                if job is not None:
+                    job[0].cancel()
+        except queue.Empty:
+            pass
+        self._jobs.put(None)
+
+    def _run(self) -> None:
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            future, fn, args = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                result = fn(*args)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
 class ClarityChat:
     def __init__(self):
         """Initialize the Clarity Chat application."""
         self.config = load_config()
-        self.client = OpenAI(api_key=get_api_key())
+        self.client = get_openai_client(get_api_key())
         self.conversation_history: List[Dict[str, str]] = []
         self.log_file: Optional[Path] = None
+        self._log_fh: Optional[TextIO] = None
+        # System prompt + memory context, rebuilt only when either changes
+        self._prefix_messages: Optional[List[Dict[str, str]]] = None
+        
+        # Only the most recent messages are sent with each request; older ones
+        # are folded into a rolling summary every few messages
+        self._max_history_messages: int = self.config['max_history_messages']
+        self._history_summary_interval: int = self.config['history_summary_interval']
+        self._rolling_summary: Optional[Dict[str, Any]] = None
+        self._summarized_upto = 0  # Leading history messages handed to the summarizer
+        self._pending_history_summary: Optional[Future] = None
+        
+        # Argument-less slash commands; /memory takes subcommands and is handled in run()
+        self._commands: Dict[str, Callable[[], None]] = {
+            '/exit': self._handle_exit,
+            '/quit': self._handle_exit,
+            '/reset': self.reset_conversation,
+            '/reload': self.reload_boot_doc,
+            '/which_bootdoc': self.show_bootdoc,
+            '/bootdoc': self.show_bootdoc,
+            '/help': self.show_help,
+        }
+        
+        # Memory settings cannot change mid-session, so resolve them once
+        self._mem_cfg: Dict[str, Any] = self.config.get('memory') or {}
         
         # Only initialize memory store if memory config exists and is enabled
         self.memory_store = None
-        if 'memory' in self.config and self.config['memory'].get('enable_long_term_memory', False):
+        if self._mem_cfg.get('enable_long_term_memory', False):
             # Get the model from config, default to 'gpt-4-1106-preview' for backward compatibility
-            memory_model = self.config['memory'].get('model', self.config.get('model', 'gpt-4-1106-preview'))
+            memory_model = self._mem_cfg.get('model', self.config.get('model', 'gpt-4-1106-preview'))
             self.memory_store = MemoryStore(
                 model=memory_model,
-                api_key=get_api_key()  # Pass the same API key used by the chat client
+                client=self.client  # Share the chat client's connection pool
             )
+        self._mem_enabled: bool = self.memory_store is not None
+        
+        # Memory summaries run on a worker thread every few turns so the API call
+        # overlaps with the user typing instead of blocking the exit
+        self._summary_every_turns: int = self._mem_cfg.get('background_summary_turns', 5)
+        self._summary_executor: Optional[_SummaryWorker] = None
+        self._pending_summary: Optional[Future] = None
+        self._pending_summary_start = 0  # History index where the in-flight batch begins
+        self._turns_since_summary = 0
+        self._summary_start = 0  # First history message not yet handed to a memory summary
+        # Worker warnings are printed between prompts, not over the user's typing
+        self._summary_log: Optional[_DeferredLogHandler] = None
+        if self._mem_enabled:
+            self._summary_executor = _SummaryWorker()
+            self._summary_log = _DeferredLogHandler()
+            logging.getLogger(MemoryStore.__module__).addHandler(self._summary_log)
             
         signal.signal(signal.SIGINT, self._handle_exit)
         self.setup_logging()
         self.load_boot_doc()
         
         # Only load memory context if memory is enabled
-        if self.memory_store is not None:
+        if self._mem_enabled:
             self._load_memory_and_context()
+            # Messages loaded from the last session were summarized then
+            self._summary_start = len(self.conversation_history)
 
     def load_boot_doc(self) -> None:
         """Load the boot document from the configured path."""
@@ -50,6 +163,7 @@ class ClarityChat:
             
         with open(boot_doc_path, 'r', encoding='utf-8') as f:
             self.boot_doc = f.read()
+        self._prefix_messages = None
             
         print(f"{Fore.GREEN}✓ Loaded boot doc from {boot_doc_path}")
         print(f"{Fore.CYAN}Model: {self.config['model']} (temp: {self.config['temperature']})")
@@ -65,25 +179,40 @@ class ClarityChat:
                 break
             session_num += 1
         
-        with open(self.log_file, 'a', encoding='utf-8') as f:
-            f.write(f"=== Session started at {datetime.now().isoformat()} ===\n")
-            f.write(f"Boot doc: {self.config['boot_doc_path']}\n")
-            f.write(f"Model: {self.config['model']} (temp: {self.config['temperature']})\n")
-            f.write("-" * 50 + "\n\n")
+        # Keep the log open for the whole session; writes are batched by the
+        # buffer and flushed before each prompt and on exit.
+        self._log_fh = open(self.log_file, 'a', buffering=65536, encoding='utf-8')
+        self._log_fh.write(
+            f"=== Session started at {datetime.now().isoformat()} ===\n"
+            f"Boot doc: {self.config['boot_doc_path']}\n"
+            f"Model: {self.config['model']} (temp: {self.config['temperature']})\n"
+            + "-" * 50 + "\n\n"
+        )
 
     def log_message(self, role: str, content: str) -> None:
         """Log a message to the session log file."""
-        if not self.log_file:
+        if not self._log_fh:
             return
             
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        with open(self.log_file, 'a', encoding='utf-8') as f:
-            f.write(f"[{timestamp}] {role.upper()}:\n{content}\n\n")
+        self._log_fh.write(f"[{timestamp}] {role.upper()}:\n{content}\n\n")
+
+    def flush_log(self) -> None:
+        """Flush buffered log output to disk."""
+        if self._log_fh:
+            self._log_fh.flush()
+
+    def close_log(self) -> None:
+        """Flush and close the session log file."""
+        if self._log_fh:
+            self._log_fh.flush()
+            self._log_fh.close()
+            self._log_fh = None
 
     def _get_memory_context(self) -> List[Dict[str, str]]:
         """Get memory context to include in the conversation."""
         memory_messages = []
-        if self.memory_store and self.config.get('memory', {}).get('enable_long_term_memory', False):
+        if self._mem_enabled:
             memory = self.memory_store.load_long_term_memory()
             if memory:
                 memory_messages.append({
@@ -104,10 +233,10 @@ class ClarityChat:
 
     def _load_memory_and_context(self) -> None:
         """Load memory and context from previous sessions if enabled."""
-        if not self.memory_store or not self.config.get('memory', {}).get('enable_long_term_memory', False):
+        if not self._mem_enabled:
             return
             
-        memory_config = self.config['memory']
+        memory_config = self._mem_cfg
         if memory_config.get('enable_last_session_context', False):
             max_turns = memory_config.get('max_last_session_turns', 20)
             last_session_messages = self.memory_store.load_last_session_context(
@@ -118,35 +247,116 @@ class ClarityChat:
                 self.conversation_history.extend(last_session_messages)
                 print(f"{Fore.CYAN}✓ Loaded context from last session ({len(last_session_messages)} messages)\n")
 
-    def get_chat_response(self, user_input: str) -> str:
-        """Get a response from the OpenAI API with memory context."""
+    def get_chat_response(self, user_input: str) -> Iterator[str]:
+        """Stream a response from the OpenAI API with memory context.
+        
+        Yields content deltas as they arrive. The complete reply is appended
+        to the conversation history once the stream is exhausted.
+        """
         try:
             self.conversation_history.append({"role": "user", "content": user_input})
             
-            messages = [{"role": "system", "content": self.boot_doc}]
-            if self.config.get('memory', {}).get('enable_long_term_memory', False):
-                messages.extend(self._get_memory_context())
-            
-            messages.extend(self.conversation_history)
+            prefix = self._prefix_messages or self._build_prefix()
+            messages = prefix + self._windowed_history()
             
             response = self.client.chat.completions.create(
                 model=self.config['model'],
                 messages=messages,
                 temperature=self.config['temperature'],
-                max_tokens=self.config['max_tokens']
+                max_tokens=self.config['max_tokens'],
+                stream=True
             )
             
-            assistant_reply = response.choices[0].message.content
-            self.conversation_history.append({"role": "assistant", "content": assistant_reply})
+            buf = []
+            for chunk in response:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content or ""
+                if delta:
+                    buf.append(delta)
+                    yield delta
             
-            return assistant_reply
+            self.conversation_history.append({"role": "assistant", "content": "".join(buf)})
             
         except Exception as e:
-            return f"Error getting response: {str(e)}"
+            yield f"Error getting response: {str(e)}"
+
+    def _build_prefix(self) -> List[Dict[str, str]]:
+        """Build and cache the system messages that precede the conversation."""
+        prefix = [{"role": "system", "content": self.boot_doc}]
+        if self._mem_enabled:
+            prefix.extend(self._get_memory_context())
+        self._prefix_messages = prefix
+        return prefix
+
+    def _windowed_history(self) -> List[Dict[str, str]]:
+        """Return the recent history to send, preceded by a summary of anything dropped."""
+        cut = len(self.conversation_history) - self._max_history_messages
+        if cut <= 0:
+            return self.conversation_history
+        
+        # Dropped messages are summarized in the background; until a new
+        # summary lands, the previous one is sent
+        self._collect_history_summary()
+        
+        recent = self.conversation_history[cut:]
+        if not self._rolling_summary:
+            return recent
+        
+        summary = self._rolling_summary
+        lines = ["SUMMARY OF EARLIER CONVERSATION (older messages omitted):"]
+        if summary.get('user_profile'):
+            lines.append(f"User Profile: {summary['user_profile']}")
+        for label, key in (("Preferences", 'preferences'),
+                           ("Work in Progress", 'work_in_progress'),
+                           ("Open Loops", 'open_loops')):
+            if summary.get(key):
+                lines.append(f"{label}: {'; '.join(summary[key])}")
+        return [{"role": "system", "content": "\n".join(lines)}] + recent
+
+    def _schedule_history_summary(self) -> None:
+        """Hand messages dropped from the history window to the summary worker in batches."""
+        if self.memory_store is None:
+            return
+        
+        self._collect_history_summary()
+        cut = len(self.conversation_history) - self._max_history_messages
+        if cut - self._summarized_upto < self._history_summary_interval:
+            return
+        if self._pending_history_summary is not None:
+            return
+        
+        batch = self.conversation_history[self._summarized_upto:cut]
+        # Advance even on failure so a bad summary isn't retried every turn
+        self._summarized_upto = cut
+        self._pending_history_summary = self._summary_executor.submit(
+            self.memory_store.summarize_conversation, batch
+        )
+
+    def _collect_history_summary(self) -> None:
+        """Fold a finished background history summary into the rolling summary."""
+        future = self._pending_history_summary
+        if future is None or not future.done():
+            return
+        self._pending_history_summary = None
+        try:
+            summary = future.result()
+        except Exception:
+            summary = None
+        if summary:
+            self._rolling_summary = summary if self._rolling_summary is None \
+                else merge_memory(self._rolling_summary, summary)
 
     def reset_conversation(self) -> None:
         """Reset the conversation history."""
         self.conversation_history = []
+        self._turns_since_summary = 0
+        self._summary_start = 0
+        self._pending_summary_start = 0
+        self._rolling_summary = None
+        self._summarized_upto = 0
+        self._pending_history_summary = None  # Its result covers the old conversation
+        self._prefix_messages = None
         print(f"{Fore.YELLOW}Conversation history cleared. Starting a new conversation.\n")
 
     def reload_boot_doc(self) -> None:
@@ -155,6 +365,11 @@ class ClarityChat:
         self.reset_conversation()
         print(f"{Fore.GREEN}✓ Boot document reloaded\n")
 
+    def show_bootdoc(self) -> None:
+        """Print the current boot document path and its modification time."""
+        print(f"Current boot document: {self.config['boot_doc_path']}")
+        print(f"Last modified: {time.ctime(os.path.getmtime(self.config['boot_doc_path']))}\n")
+
     def show_help(self) -> None:
         """Show available commands."""
         print("\nAvailable commands:")
@@ -166,17 +381,14 @@ class ClarityChat:
         print("  /which_bootdoc  - Print current boot document path (alias: /bootdoc)")
         
         # Only show memory command if memory is enabled
-        if hasattr(self, 'memory_store') and self.memory_store is not None and \
-           self.config.get('memory', {}).get('enable_long_term_memory', False):
+        if self._mem_enabled:
             print("  /memory         - Show current memory state")
             
         print()
         # Show memory status line only if memory is enabled
-        memory_enabled = self.memory_store is not None and self.config.get('memory', {}).get('enable_long_term_memory', False)
-        if memory_enabled:
+        if self._mem_enabled:
             memory = self.memory_store.load_long_term_memory()
             if memory:
-                print(f"{Fore.GREEN}✓ Long-term memory is enabled (last updated: {memory.get('last_updated', 'never')})\n{Style.RESET_ALL}")
                 last_updated = memory.get('last_updated', 'never')
                 print(f"{Fore.GREEN}✓ Long-term memory is enabled (last updated: {last_updated})\n{Style.RESET_ALL}")
 
@@ -191,46 +403,103 @@ class ClarityChat:
             print("No long-term memory found. Share some information about yourself or your work to build memory.")
             return
 
-        print("\n=== Long-term Memory ===")
-        print(f"Last updated: {memory.get('last_updated', 'unknown')}")
+        # Build the whole report and emit it with a single write
+        parts = ["\n=== Long-term Memory ===", f"Last updated: {memory.get('last_updated', 'unknown')}"]
 
         if memory.get('user_profile'):
-            print(f"\nAbout You: {memory['user_profile']}")
+            parts.append(f"\nAbout You: {memory['user_profile']}")
 
         if memory.get('preferences'):
-            print("\nYour Preferences:" + "-" * 50)
-            for i, pref in enumerate(memory['preferences'], 1):
-                print(f"{i}. {pref}")
+            parts.append("\nYour Preferences:" + "-" * 50)
+            parts.extend(f"{i}. {pref}" for i, pref in enumerate(memory['preferences'], 1))
 
         if memory.get('work_in_progress'):
-            print("\nYour Projects:" + "-" * 50)
-            for i, work in enumerate(memory['work_in_progress'], 1):
-                print(f"{i}. {work}")
+            parts.append("\nYour Projects:" + "-" * 50)
+            parts.extend(f"{i}. {work}" for i, work in enumerate(memory['work_in_progress'], 1))
 
         if memory.get('open_loops'):
-            print("\nOpen Items:" + "-" * 50)
-            for i, loop in enumerate(memory['open_loops'], 1):
-                print(f"{i}. {loop}")
+            parts.append("\nOpen Items:" + "-" * 50)
+            parts.extend(f"{i}. {loop}" for i, loop in enumerate(memory['open_loops'], 1))
+
+        parts.append("\n" + "=" * 70 + "\n")
+        sys.stdout.write("\n".join(parts))
+
+    def _on_summary_done(self, future: Future) -> None:
+        """Drop the cached prefix once a background summary has updated memory."""
+        self._prefix_messages = None
+
+    def _schedule_background_summary(self) -> None:
+        """Count a completed turn and hand recent turns to the summary worker when due."""
+        if not self._mem_enabled:
+            return
+        
+        self._turns_since_summary += 1
+        if self._turns_since_summary < self._summary_every_turns:
+            return
+        # Keep at most one summary in flight; the next turn will try again
+        if self._pending_summary is not None and not self._pending_summary.done():
+            return
+        
+        recent_messages = self.conversation_history[self._summary_start:]
+        self._pending_summary_start = self._summary_start
+        self._summary_start = len(self.conversation_history)
+        self._turns_since_summary = 0
+        self._pending_summary = self._summary_executor.submit(
+            self.memory_store.update_long_term_memory, recent_messages
+        )
+        self._pending_summary.add_done_callback(self._on_summary_done)
 
-        print("\n" + "=" * 70)
+    def _report_background_warnings(self) -> None:
+        """Print warnings the summary worker logged since the last report."""
+        if self._summary_log is None:
+            return
+        records = self._summary_log.records
+        while records:
+            print(f"{Fore.YELLOW}! Background memory summary: {records.popleft().getMessage()}{Style.RESET_ALL}")
+
+    def _wait_for_background_summary(self) -> Optional[bool]:
+        """Wait for an in-flight background summary and return its result."""
+        future, self._pending_summary = self._pending_summary, None
+        if future is None:
+            self._report_background_warnings()
+            return None
+        if not future.done():
+            print("Waiting for background memory update to finish...")
+        try:
+            return future.result(timeout=SUMMARY_WAIT_TIMEOUT)
+        except FutureTimeoutError:
+            # The worker is a daemon thread, so it won't hold up exit; its
+            # messages are summarized again by the exit summary instead
+            print(f"! Background memory update still running after {SUMMARY_WAIT_TIMEOUT}s, abandoning it")
+            self._summary_start = min(self._summary_start, self._pending_summary_start)
+            return False
+        except Exception as e:
+            print(f"Background memory update failed: {str(e)}")
+            return False
+        finally:
+            self._report_background_warnings()
 
     def _summarize_session(self) -> bool:
         """Summarize the current session and update long-term memory using the model."""
         try:
-            if not hasattr(self, 'memory_store') or self.memory_store is None or \
-               not self.conversation_history or \
-               not self.config.get('memory', {}).get('enable_long_term_memory', False):
-                return False
-
-            # Only summarize if we have enough conversation history
-            if len(self.conversation_history) < 2:  # At least one user-assistant exchange
+            if not self._mem_enabled or not self.conversation_history:
                 return False
+            
+            # Let a background summary land first so the two saves don't race
+            background_result = self._wait_for_background_summary()
+            
+            # Messages already handed to the background worker are not summarized again
+            if self._summary_start >= len(self.conversation_history):
+                return bool(background_result)
                 
             print("\nAnalyzing conversation for memory updates...")
             
-            # Only include the last few messages for memory updates
-            recent_messages = self.conversation_history[-4:]  # Last 2 exchanges
+            # Only include the messages not yet covered by a background summary
+            recent_messages = self.conversation_history[self._summary_start:]
+            self._summary_start = len(self.conversation_history)
+            self._turns_since_summary = 0
             result = self.memory_store.update_long_term_memory(recent_messages)
+            self._prefix_messages = None
             
             if result is None:
                 print("No memory updates needed (no new information to store)")
@@ -253,10 +522,7 @@ class ClarityChat:
         print("\n" + Fore.YELLOW + "Saving session..." + Style.RESET_ALL)
         
         try:
-            memory_enabled = hasattr(self, 'memory_store') and self.memory_store is not None and \
-                           self.config.get('memory', {}).get('enable_long_term_memory', False)
-                           
-            if memory_enabled and hasattr(self, 'conversation_history') and self.conversation_history:
+            if self._mem_enabled and hasattr(self, 'conversation_history') and self.conversation_history:
                 print("Summarizing conversation for memory updates...")
                 success = self._summarize_session()
                 if success:
@@ -265,11 +531,12 @@ class ClarityChat:
                     print(Fore.YELLOW + "! No new memory updates were made" + Style.RESET_ALL)
             
             # Save the conversation log and add to memory chunks if memory is enabled
+            self.close_log()
             if hasattr(self, 'log_file') and self.log_file:
                 print(f"Session log saved to: {self.log_file}")
                 
                 # Add log chunks to memory store if memory is enabled
-                if memory_enabled:
+                if self._mem_enabled:
                     try:
                         print("Adding conversation chunks to memory...")
                         self.memory_store.add_log_chunks(str(self.log_file))
@@ -284,6 +551,11 @@ class ClarityChat:
             import traceback
             traceback.print_exc()
         finally:
+            self.close_log()
+            if self._summary_executor is not None:
+                self._summary_executor.shutdown()
+            if self._summary_log is not None:
+                logging.getLogger(MemoryStore.__module__).removeHandler(self._summary_log)
             print("\nGoodbye!" + Style.RESET_ALL)
             sys.exit(0)
 
@@ -295,6 +567,8 @@ class ClarityChat:
             while True:
                 try:
                     try:
+                        self.flush_log()
+                        self._report_background_warnings()
                         user_input = input(f"{Fore.BLUE}Clarity OS > {Style.RESET_ALL}").strip()
                     except (EOFError, KeyboardInterrupt):
                         self._handle_exit(None, None)
@@ -305,89 +579,73 @@ class ClarityChat:
                     
                     self.log_message("user", user_input)
                     
-                    if user_input.lower() in ('/exit', '/quit'):
-                        self._handle_exit()
-                        break
-                        
-                    elif user_input.lower() == '/reset':
-                        self.reset_conversation()
-                        continue
-                        
-                    elif user_input.lower() == '/reload':
-                        self.reload_boot_doc()
-                        continue
-                        
-                    elif user_input.lower() in ('/which_bootdoc', '/bootdoc'):
-                        print(f"Current boot document: {self.config['boot_doc_path']}")
-                        print(f"Last modified: {time.ctime(os.path.getmtime(self.config['boot_doc_path']))}\n")
-                        continue
-                        
-                    elif user_input.lower() == '/help':
-                        self.show_help()
+                    # Only the command token is lowercased, never the whole message
+                    cmd_token = user_input.split(maxsplit=1)[0].lower() if user_input.startswith('/') else None
+                    handler = self._commands.get(cmd_token)
+                    if handler is not None:
+                        handler()
                         continue
                         
-                    elif user_input.lower().startswith('/memory'):
+                    elif cmd_token == '/memory':
                         parts = user_input.split(maxsplit=1)
                         if len(parts) > 1:
                             cmd_parts = parts[1].split(maxsplit=2)
                             action = cmd_parts[0].lower()
                             
+                            # Edits go through modify_long_term_memory so a background
+                            # summary can't save between our load and save
                             if action == 'set' and len(cmd_parts) > 2:
                                 mem_type = cmd_parts[1].lower()
                                 value = cmd_parts[2].strip('"\'')
-                                memory = self.memory_store.load_long_term_memory()
-                                if memory is None:
-                                    memory = {
-                                        'user_profile': '',
-                                        'preferences': [],
-                                        'work_in_progress': [],
-                                        'open_loops': [],
-                                        'last_updated': ''
-                                    }
-                                if mem_type == 'user_profile':
+                                
+                                def set_profile(memory: Dict[str, Any]) -> bool:
                                     memory['user_profile'] = value
+                                    return True
+                                
+                                if mem_type == 'user_profile' and self.memory_store.modify_long_term_memory(set_profile):
                                     print(f"{Fore.GREEN}✓ Updated user profile{Style.RESET_ALL}")
-                                self.memory_store.save_long_term_memory(memory)
+                                    self._prefix_messages = None
                                 
                             elif action == 'add' and len(cmd_parts) > 2:
                                 mem_type = cmd_parts[1].lower()
                                 value = cmd_parts[2].strip('"\'')
-                                memory = self.memory_store.load_long_term_memory()
-                                if memory is None:
-                                    memory = {
-                                        'user_profile': '',
-                                        'preferences': [],
-                                        'work_in_progress': [],
-                                        'open_loops': [],
-                                        'last_updated': ''
-                                    }
-                                if mem_type == 'preference' and value not in memory['preferences']:
+                                
+                                def add_preference(memory: Dict[str, Any]) -> bool:
+                                    if value in memory['preferences']:
+                                        return False
                                     memory['preferences'].append(value)
+                                    return True
+                                
+                                if mem_type == 'preference' and self.memory_store.modify_long_term_memory(add_preference):
                                     print(f"{Fore.GREEN}✓ Added preference: {value}{Style.RESET_ALL}")
-                                    self.memory_store.save_long_term_memory(memory)
+                                    self._prefix_messages = None
                         else:
                             memory = self.memory_store.load_long_term_memory()
                             if memory:
-                                print(f"\n{Fore.CYAN}=== Long-term Memory ==={Style.RESET_ALL}")
-                                print(f"Last updated: {memory.get('last_updated', 'Never')}")
-                                print(f"User Profile: {memory.get('user_profile', 'Not specified')}")
-                                print(f"Preferences: {', '.join(memory.get('preferences', [])) or 'None'}")
-                                print(f"Work in Progress: {', '.join(memory.get('work_in_progress', [])) or 'None'}")
-                                print(f"Open Loops: {', '.join(memory.get('open_loops', [])) or 'None'}\n")
+                                sys.stdout.write(
+                                    f"\n{Fore.CYAN}=== Long-term Memory ==={Style.RESET_ALL}\n"
+                                    f"Last updated: {memory.get('last_updated', 'Never')}\n"
+                                    f"User Profile: {memory.get('user_profile', 'Not specified')}\n"
+                                    f"Preferences: {', '.join(memory.get('preferences', [])) or 'None'}\n"
+                                    f"Work in Progress: {', '.join(memory.get('work_in_progress', [])) or 'None'}\n"
+                                    f"Open Loops: {', '.join(memory.get('open_loops', [])) or 'None'}\n\n"
+                                )
                             else:
                                 print(f"{Fore.YELLOW}No long-term memory found or memory is disabled.{Style.RESET_ALL}\n")
                         continue
                     
                     print(f"{Fore.GREEN}Assistant: ", end='', flush=True)
                     
-                    response = self.get_chat_response(user_input)
-                    
-                    for char in response:
-                        print(char, end='', flush=True)
-                        time.sleep(0.01)
+                    buf = []
+                    for token in self.get_chat_response(user_input):
+                        sys.stdout.write(token)
+                        sys.stdout.flush()
+                        buf.append(token)
                     print("\n")
                     
-                    self.log_message("assistant", response)
+                    self.log_message("assistant", "".join(buf))
+                    self._schedule_background_summary()
+                    self._schedule_history_summary()
                     
                 except Exception as e:
                     error_msg = f"Error: {str(e)}"
@@ -396,7 +654,7 @@ class ClarityChat:
         
         finally:
             # Removed redundant _summarize_session() call as it's already handled by _handle_exit()
-            pass
+            self.close_log()
 
 
 def main():
@@ -1,17 +1,201 @@
+import io
+import os
 import json
+import hashlib
+import logging
 import re
+import heapq
+import threading
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Tuple
+from typing import TYPE_CHECKING, List, Dict, Any, Callable, Iterable, Optional, Tuple, Union
 from datetime import datetime
-from openai import OpenAI
+from itertools import chain
+
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+try:
+    import orjson  # Optional C-accelerated JSON codec
+except ImportError:
+    orjson = None
+
+log = logging.getLogger(__name__)
+
+# Set CLARITY_PRETTY_JSON=1 to indent the memory file for hand inspection
+PRETTY_JSON = os.getenv('CLARITY_PRETTY_JSON', '').strip().lower() in ('1', 'true', 'yes')
+
+# Session log file extensions considered by load_last_session_context
+SESSION_LOG_SUFFIXES = ('.txt', '.log')
+
+# The previous session log is read from its end in blocks of this size;
+# files up to TAIL_SMALL_FILE_BYTES are simply read whole
+TAIL_BLOCK_BYTES = 64 * 1024
+TAIL_SMALL_FILE_BYTES = 128 * 1024
+# Extra messages to read past the ones requested, as a safety margin
+TAIL_MARKER_SLACK = 4
+
+# System prompt paired with response_format={"type": "json_object"}; JSON mode
+# requires the word "JSON" to appear in the messages.
+SUMMARY_SYSTEM_PROMPT = (
+    "You extract stable long-term memory from conversations. "
+    "Respond with a single JSON object and no other text."
+)
+
+# Matches a message header in a session log, e.g. "[2024-01-01 12:00:00] USER:"
+# or a bare "assistant: text"; group 1 is the role, group 2 any inline content.
+ROLE_MARKER_RE = re.compile(
+    r'^\s*(?:\[[^\]]*\]\s*)?(user|assistant|system|function|tool|developer)\s*:\s*(.*)$',
+    re.IGNORECASE
+)
+
+# Static body of the summarization prompt; only the transcript is substituted
+SUMMARIZATION_PROMPT_TEMPLATE = """\
+Analyze the following conversation and extract ONLY stable facts, preferences, and ongoing work items.
+
+STABLE FACTS CRITERIA:
+- Must be information that is unlikely to change over time
+- Must be verifiable and objective
+- Must not include personal opinions, feelings, or temporary states
+- Must not include time-sensitive information
+- Must be generally applicable across different contexts
+
+EXAMPLES OF STABLE FACTS:
+- "I prefer Python over JavaScript" (preference)
+- "I'm working on a web application" (work in progress)
+- "I have experience with machine learning" (profile)
+
+EXAMPLES OF UNSTABLE INFORMATION (DO NOT INCLUDE):
+- "I'm feeling tired today" (temporary state)
+- "I'll finish this by Friday" (time-sensitive)
+- "This code is giving me errors" (temporary issue)
+- "I think we should refactor this" (opinion)
+
+Conversation to analyze:
+{conversation_text}
+
+Return a JSON object with the following structure:
+{{
+    // A brief, stable description of the user (e.g., skills, background, etc.)
+    "user_profile": "string",
+
+    // List of stable preferences (e.g., technology choices, workflow preferences)
+    // Only include preferences that are consistent over time
+    "preferences": ["string"],
+
+    // List of ongoing work items or projects
+    // Only include items that represent actual work in progress
+    "work_in_progress": ["string"],
+
+    // List of unresolved topics or questions that need follow-up
+    // Only include topics that are still relevant and not time-sensitive
+    "open_loops": ["string"]
+}}
+
+IMPORTANT:
+- Only include information that meets the stable facts criteria
+- If no information meets the criteria for a field, use an empty array []
+- Do not include any explanations or additional text outside the JSON
+- The response must be valid JSON that can be parsed by json.loads()
+- If unsure whether something is a stable fact, do not include it
+"""
+
+# Part of every summary cache key, so editing either prompt invalidates old summaries
+SUMMARY_PROMPT_DIGEST = hashlib.blake2b(
+    (SUMMARY_SYSTEM_PROMPT + SUMMARIZATION_PROMPT_TEMPLATE).encode('utf-8'), digest_size=8
+).hexdigest()
+
+# Message roles that carry conversation content worth summarizing
+SUMMARY_ROLES = frozenset(('user', 'assistant'))
+
+# Summaries kept in memory/summary_cache.json; oldest entries are evicted first
+SUMMARY_CACHE_MAX_ENTRIES = 256
+
+MEMORY_CONTENT_KEYS = ('user_profile', 'preferences', 'work_in_progress', 'open_loops')
+
+
+def _dumps(obj: Any) -> bytes:
+    """Serialize to UTF-8 JSON (compact unless PRETTY_JSON), using orjson when available."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if PRETTY_JSON else 0)
+    if PRETTY_JSON:
+        return json.dumps(obj, indent=2, ensure_ascii=False).encode('utf-8')
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def _loads(data: Union[bytes, str]) -> Any:
+    """Parse JSON from bytes or str, using orjson when available."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _atomic_write(path: Path, data: bytes) -> None:
+    """Write data to a temporary file, then swap it into place with os.replace."""
+    temp_path = path.with_suffix('.tmp')
+    try:
+        temp_path.write_bytes(data)
+        # os.replace overwrites atomically on both POSIX and Windows
+        os.replace(temp_path, path)
+    except OSError:
+        # Don't leave a half-written temp file behind
+        temp_path.unlink(missing_ok=True)
+        raise
+
+
+def _content_digest(memory: Dict[str, Any]) -> bytes:
+    """Hash the content fields of a memory dict, ignoring last_updated."""
+    content = [memory.get(key) for key in MEMORY_CONTENT_KEYS]
+    return hashlib.blake2b(_dumps(content), digest_size=16).digest()
+
+
+def _is_str_list(value: Any) -> bool:
+    """Return True if value is a list containing only strings."""
+    return type(value) is list and all(type(item) is str for item in value)
+
+
+def _merge_unique(a: List[str], b: List[str]) -> List[str]:
+    """Concatenate two lists, dropping duplicates while keeping first-seen order."""
+    return list(dict.fromkeys(chain(a, b)))
+
+
+def merge_memory(current: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Merge a new summary into existing memory, keeping the newer non-empty profile.
+    
+    The result has no 'last_updated'; save_long_term_memory stamps it on write.
+    """
+    return {
+        'user_profile': new['user_profile'] or current['user_profile'],
+        'preferences': _merge_unique(current['preferences'], new['preferences']),
+        'work_in_progress': _merge_unique(current['work_in_progress'], new['work_in_progress']),
+        'open_loops': _merge_unique(current['open_loops'], new['open_loops'])
+    }
+
 
 class MemoryStore:
-    def __init__(self, memory_dir: str = "memory", model: str = "gpt-4-1106-preview", api_key: str = None):
+    def __init__(self, memory_dir: str = "memory", model: str = "gpt-4-1106-preview", api_key: str = None,
+                 client: Optional['OpenAI'] = None, max_prompt_turns: int = 20):
         self.memory_dir = Path(memory_dir).resolve()
         self.memory_dir.mkdir(parents=True, exist_ok=True)
         self.long_term_memory_path = self.memory_dir / "long_term.json"
-        self.client = OpenAI(api_key=api_key) if api_key else OpenAI()
+        self.summary_cache_path = self.memory_dir / "summary_cache.json"
+        if client is not None:
+            self.client = client
+        else:
+            # Imported lazily: the SDK is heavy and unused when a client is injected
+            from openai import OpenAI
+            self.client = OpenAI(api_key=api_key) if api_key else OpenAI()
         self.model = model
+        # Only the most recent turns (user + assistant pairs) are sent for summarization
+        self.max_prompt_turns = max_prompt_turns
+        # Serializes read-merge-write cycles; summaries may run on a worker thread
+        self._lock = threading.RLock()
+        # ((mtime_ns, size), parsed memory) of the last load or save
+        self._memory_cache: Optional[Tuple[Tuple[int, int], Dict[str, Any]]] = None
+        # ((mtime_ns, size), content digest) of the file as last written by us
+        self._last_saved: Optional[Tuple[Tuple[int, int], bytes]] = None
+        # Conversation hash -> summary, lazily loaded from summary_cache_path
+        self._summary_cache: Optional[Dict[str, Dict[str, Any]]] = None
     
     def add_log_chunks(self, log_path: str) -> None:
         pass
@@ -20,68 +204,102 @@ class MemoryStore:
         return []
     
     def load_long_term_memory(self) -> Optional[Dict[str, Any]]:
-        if not self.long_term_memory_path.exists():
+        try:
+            st = self.long_term_memory_path.stat()
+        except OSError:
             return None
+        key = (st.st_mtime_ns, st.st_size)
+        
+        # Skip re-parsing when the file hasn't changed since the last load or save
+        if self._memory_cache is not None and self._memory_cache[0] == key:
+            return self._copy_memory(self._memory_cache[1])
             
         try:
-            with open(self.long_term_memory_path, 'r', encoding='utf-8') as f:
-                memory = json.load(f)
+            memory = _loads(self.long_term_memory_path.read_bytes())
                 
             if not self._validate_memory_format(memory):
                 return None
-                
-            return memory
+            
+            self._memory_cache = (key, memory)
+            return self._copy_memory(memory)
             
         except (json.JSONDecodeError, IOError, Exception):
             return None
     
+    @staticmethod
+    def _copy_memory(memory: Dict[str, Any]) -> Dict[str, Any]:
+        """Copy a memory dict so callers can mutate it without touching the cache."""
+        return {k: list(v) if isinstance(v, list) else v for k, v in memory.items()}
+    
+    def modify_long_term_memory(self, update: Callable[[Dict[str, Any]], bool]) -> bool:
+        """
+        Apply update to the stored memory and save it, holding the lock from load to save
+        so a background summary can't be overwritten in between.
+        
+        update receives the current memory (an empty one if none is stored) and returns
+        True if it changed anything. Returns True if the changed memory was saved.
+        """
+        with self._lock:
+            memory = self.load_long_term_memory()
+            if memory is None:
+                memory = {key: [] for key in MEMORY_CONTENT_KEYS}
+                memory['user_profile'] = ''
+                memory['last_updated'] = ''
+            if not update(memory):
+                return False
+            return self.save_long_term_memory(memory)
+    
     def save_long_term_memory(self, memory: Dict[str, Any]) -> bool:
         """Save the long-term memory to disk."""
         try:
-            print(f"Debug: Saving memory to {self.long_term_memory_path}")
-            memory['last_updated'] = datetime.now().isoformat()
+            digest = _content_digest(memory)
             
-            # Ensure the directory exists
-            self.memory_dir.mkdir(parents=True, exist_ok=True)
-            
-            # Write to a temporary file first, then rename (atomic operation)
-            temp_path = self.long_term_memory_path.with_suffix('.tmp')
-            with open(temp_path, 'w', encoding='utf-8') as f:
-                json.dump(memory, f, indent=2, ensure_ascii=False)
-            
-            # On Windows, we need to handle file replacement carefully
-            if self.long_term_memory_path.exists():
-                self.long_term_memory_path.unlink()
-            temp_path.rename(self.long_term_memory_path)
+            with self._lock:
+                # Skip the write if we already wrote this exact content and the
+                # file hasn't been touched since
+                if self._last_saved is not None and self._last_saved[1] == digest:
+                    try:
+                        st = self.long_term_memory_path.stat()
+                        if self._last_saved[0] == (st.st_mtime_ns, st.st_size):
+                            log.debug("Memory unchanged, skipping save")
+                            return True
+                    except OSError:
+                        pass
+                
+                log.debug("Saving memory to %s", self.long_term_memory_path)
+                memory['last_updated'] = datetime.now().isoformat()
+                
+                # Ensure the directory exists
+                self.memory_dir.mkdir(parents=True, exist_ok=True)
+                
+                _atomic_write(self.long_term_memory_path, _dumps(memory))
+                
+                # Prime the load cache so the next read doesn't re-parse what we just wrote
+                st = self.long_term_memory_path.stat()
+                key = (st.st_mtime_ns, st.st_size)
+                self._memory_cache = (key, self._copy_memory(memory))
+                self._last_saved = (key, digest)
             
-            print(f"Debug: Memory saved successfully to {self.long_term_memory_path}")
+            log.debug("Memory saved successfully to %s", self.long_term_memory_path)
             return True
         except Exception as e:
-            print(f"Debug: Error saving memory: {str(e)}")
+            log.warning("Error saving memory: %s", e)
             return False
     
+    @staticmethod
+    def _validate_summary_format(summary: Any) -> bool:
+        # Decoded JSON only produces exact dict/list/str types, so plain type
+        # checks suffice; unrolled to avoid walking a schema table per call
+        return (
+            type(summary) is dict
+            and type(summary.get('user_profile')) is str
+            and _is_str_list(summary.get('preferences'))
+            and _is_str_list(summary.get('work_in_progress'))
+            and _is_str_list(summary.get('open_loops'))
+        )
+    
     def _validate_memory_format(self, memory: Dict[str, Any]) -> bool:
-        required_keys = {
-            'user_profile': str,
-            'preferences': list,
-            'work_in_progress': list,
-            'open_loops': list,
-            'last_updated': str
-        }
-        
-        if not isinstance(memory, dict):
-            return False
-            
-        for key, value_type in required_keys.items():
-            if key not in memory or not isinstance(memory[key], value_type):
-                return False
-        
-        # Additional validation for list items
-        for key in ['preferences', 'work_in_progress', 'open_loops']:
-            if not all(isinstance(item, str) for item in memory[key]):
-                return False
-                
-        return True
+        return self._validate_summary_format(memory) and type(memory.get('last_updated')) is str
     
     def _get_summarization_prompt(self, conversation_history: List[Dict[str, str]]) -> str:
         """
@@ -90,62 +308,15 @@ class MemoryStore:
         IMPORTANT: This prompt must be designed to work with the T2 spec requirement of no heuristic fallback.
         The prompt must be strict enough to ensure the model returns valid JSON in the first attempt.
         """
-        # Convert conversation to text, excluding system messages
-        conversation_text = "\n".join(
-            f"{msg['role'].upper()}: {msg['content']}" 
-            for msg in conversation_history 
-            if msg['role'] in ['user', 'assistant']
-        )
-        
-        return f"""
-        Analyze the following conversation and extract ONLY stable facts, preferences, and ongoing work items.
-        
-        STABLE FACTS CRITERIA:
-        - Must be information that is unlikely to change over time
-        - Must be verifiable and objective
-        - Must not include personal opinions, feelings, or temporary states
-        - Must not include time-sensitive information
-        - Must be generally applicable across different contexts
-        
-        EXAMPLES OF STABLE FACTS:
-        - "I prefer Python over JavaScript" (preference)
-        - "I'm working on a web application" (work in progress)
-        - "I have experience with machine learning" (profile)
-        
-        EXAMPLES OF UNSTABLE INFORMATION (DO NOT INCLUDE):
-        - "I'm feeling tired today" (temporary state)
-        - "I'll finish this by Friday" (time-sensitive)
-        - "This code is giving me errors" (temporary issue)
-        - "I think we should refactor this" (opinion)
-        
-        Conversation to analyze:
-        {conversation_text}
-        
-        Return a JSON object with the following structure:
-        {{
-            // A brief, stable description of the user (e.g., skills, background, etc.)
-            "user_profile": "string",
-            
-            // List of stable preferences (e.g., technology choices, workflow preferences)
-            // Only include preferences that are consistent over time
-            "preferences": ["string"],
-            
-            // List of ongoing work items or projects
-            // Only include items that represent actual work in progress
-            "work_in_progress": ["string"],
-            
-            // List of unresolved topics or questions that need follow-up
-            // Only include topics that are still relevant and not time-sensitive
-            "open_loops": ["string"]
-        }}
+        # Convert conversation to text, excluding system messages. A list (not a
+        # generator) lets str.join size the result without materializing twice.
+        conversation_text = "\n".join([
+            f"{msg['role'].upper()}: {msg['content']}"
+            for msg in conversation_history
+            if msg['role'] in SUMMARY_ROLES
+        ])
         
-        IMPORTANT:
-        - Only include information that meets the stable facts criteria
-        - If no information meets the criteria for a field, use an empty array []
-        - Do not include any explanations or additional text outside the JSON
-        - The response must be valid JSON that can be parsed by json.loads()
-        - If unsure whether something is a stable fact, do not include it
-        """
+        return SUMMARIZATION_PROMPT_TEMPLATE.format(conversation_text=conversation_text)
 
     def summarize_conversation(self, conversation_history: List[Dict[str, str]]) -> Optional[Dict[str, Any]]:
         """
@@ -158,12 +329,29 @@ class MemoryStore:
         Returns:
             Optional[Dict[str, Any]]: Parsed summary as a dictionary if successful, None otherwise.
         """
+        # Prompt size (and so latency and cost) is bounded by the most recent turns
+        conversation_history = conversation_history[-2 * self.max_prompt_turns:]
+        
+        # Nothing to learn from system-only history; skip the API round-trip
+        if not any(msg['role'] in SUMMARY_ROLES for msg in conversation_history):
+            return None
+        
+        # Identical conversations (retries, repeated exits) reuse the earlier summary
+        cache_key = self._summary_cache_key(conversation_history)
+        cached = self._lookup_summary(cache_key)
+        if cached is not None:
+            cached['last_updated'] = datetime.now().isoformat()
+            return cached
+        
         try:
             prompt = self._get_summarization_prompt(conversation_history)
             
             response = self.client.chat.completions.create(
                 model=self.model,
-                messages=[{"role": "user", "content": prompt}],
+                messages=[
+                    {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
+                    {"role": "user", "content": prompt}
+                ],
                 temperature=0.3,
                 response_format={"type": "json_object"}  # Enforce JSON response
             )
@@ -173,169 +361,255 @@ class MemoryStore:
             
             # Parse the JSON response
             try:
-                summary = json.loads(content)
+                summary = _loads(content)
                 
-                # Validate required fields
-                required_fields = {
-                    'user_profile': str,
-                    'preferences': list,
-                    'work_in_progress': list,
-                    'open_loops': list
-                }
+                # Same structural check as the memory file, so a summary with
+                # non-string list items can't be merged into (and invalidate) it
+                if not self._validate_summary_format(summary):
+                    log.warning("Summary from model has missing or mistyped fields")
+                    return None
                 
-                # Check if all required fields are present and of correct type
-                for field, field_type in required_fields.items():
-                    if field not in summary or not isinstance(summary[field], field_type):
-                        print(f"Error: Invalid or missing required field in summary: {field}")
-                        return None
+                self._store_summary(cache_key, summary)
                 
                 # Add timestamp
                 summary['last_updated'] = datetime.now().isoformat()
                 
                 return summary
                 
-            except json.JSONDecodeError as e:
-                print(f"Error: Invalid JSON response from model: {str(e)}")
+            except json.JSONDecodeError as e:  # orjson.JSONDecodeError subclasses this
+                log.warning("Invalid JSON response from model: %s", e)
                 return None
                 
         except Exception as e:
-            print(f"Error in summarize_conversation: {str(e)}")
+            log.warning("Error in summarize_conversation: %s", e)
             return None
 
-    def update_long_term_memory(self, conversation_history: List[Dict[str, str]]) -> bool:
+    def _summary_cache_key(self, conversation_history: List[Dict[str, str]]) -> str:
+        """Hash the model, prompt and conversation into a summary cache key."""
+        return hashlib.blake2b(
+            _dumps([self.model, SUMMARY_PROMPT_DIGEST, conversation_history]), digest_size=16
+        ).hexdigest()
+    
+    def _load_summary_cache(self) -> Dict[str, Dict[str, Any]]:
+        if self._summary_cache is None:
+            try:
+                cache = _loads(self.summary_cache_path.read_bytes())
+            except (OSError, ValueError):
+                cache = {}
+            self._summary_cache = cache if isinstance(cache, dict) else {}
+        return self._summary_cache
+    
+    def _lookup_summary(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            summary = self._load_summary_cache().get(key)
+            # A hand-edited or corrupt cache entry is treated as a miss
+            if not self._validate_summary_format(summary):
+                return None
+            return self._copy_memory(summary)
+    
+    def _store_summary(self, key: str, summary: Dict[str, Any]) -> None:
+        with self._lock:
+            cache = self._load_summary_cache()
+            cache[key] = {k: summary[k] for k in MEMORY_CONTENT_KEYS}
+            while len(cache) > SUMMARY_CACHE_MAX_ENTRIES:
+                del cache[next(iter(cache))]
+            
+            try:
+                _atomic_write(self.summary_cache_path, _dumps(cache))
+            except OSError as e:
+                log.warning("Error saving summary cache: %s", e)
+
+    def update_long_term_memory(self, conversation_history: List[Dict[str, str]]) -> Optional[bool]:
         """
         Update long-term memory with new information from the conversation.
-        Returns False if the conversation couldn't be summarized or if saving fails.
+        Returns False if the conversation couldn't be summarized or if saving fails,
+        and None if the summary added nothing new (the file is left untouched).
         """
         if not conversation_history:
-            print("No conversation history provided to update memory")
+            log.info("No conversation history provided to update memory")
             return False
 
         # Get model-based summary - this will be None if JSON validation fails
         new_memory = self.summarize_conversation(conversation_history)
         if not new_memory:
-            print("Memory not updated: Could not generate valid summary from conversation")
+            log.info("Memory not updated: Could not generate valid summary from conversation")
             return False
 
-        # Get existing memory or create new
-        current_memory = self.load_long_term_memory()
-        if not current_memory:
-            # If no existing memory, use the new memory as is
-            updated_memory = new_memory
-        else:
-            # Merge with existing memory, removing duplicates
-            updated_memory = {
-                'user_profile': new_memory['user_profile'] or current_memory['user_profile'],
-                'preferences': list(set(current_memory['preferences'] + new_memory['preferences'])),
-                'work_in_progress': list(set(current_memory['work_in_progress'] + new_memory['work_in_progress'])),
-                'open_loops': list(set(current_memory['open_loops'] + new_memory['open_loops'])),
-                'last_updated': datetime.now().isoformat()
-            }
-
-        # Save the updated memory
-        if not self.save_long_term_memory(updated_memory):
-            print("Failed to save updated memory")
-            return False
+        with self._lock:
+            # Get existing memory or create new
+            current_memory = self.load_long_term_memory()
+            if not current_memory:
+                # If no existing memory, use the new memory as is
+                updated_memory = new_memory
+            else:
+                # Merge with existing memory, removing duplicates
+                updated_memory = merge_memory(current_memory, new_memory)
+                
+                # Nothing new learned: skip rewriting the file
+                if all(updated_memory[k] == current_memory[k] for k in MEMORY_CONTENT_KEYS):
+                    return None
+
+            # Save the updated memory
+            if not self.save_long_term_memory(updated_memory):
+                log.warning("Failed to save updated memory")
+                return False
             
-        print("Memory updated successfully")
+        log.info("Memory updated successfully")
         return True
     
     def load_last_session_context(self, logs_dir: str, max_turns: int = 20) -> List[Dict[str, str]]:
         try:
             logs_path = Path(logs_dir)
             if not logs_path.exists() or not logs_path.is_dir():
-                print(f"Logs directory not found: {logs_dir}")
+                log.debug("Logs directory not found: %s", logs_dir)
                 return []
                 
-            # Look for log files with various patterns
-            log_patterns = ["session-*.txt", "session-*.log"]
-            log_files = []
-            
-            for pattern in log_patterns:
-                log_files.extend(logs_path.glob(pattern))
+            # Single directory pass over session-*.txt / session-*.log files
+            with os.scandir(logs_path) as it:
+                # Name checks are free; is_file()/stat() may hit the disk, so they
+                # only run for entries that already look like session logs
+                candidates = [
+                    (entry.stat(follow_symlinks=False).st_mtime, entry.path)
+                    for entry in it
+                    if entry.name.startswith('session-')
+                    and entry.name.endswith(SESSION_LOG_SUFFIXES)
+                    and entry.is_file(follow_symlinks=False)
+                ]
                 
-            if not log_files:
-                print(f"No session log files found in {logs_dir}")
+            if not candidates:
+                log.debug("No session log files found in %s", logs_dir)
                 return []
                 
-            # Sort by modification time, newest first
-            log_files = sorted(
-                log_files,
-                key=lambda f: f.stat().st_mtime,
-                reverse=True
-            )
+            # Only the two newest files matter, so skip the full sort
+            newest = heapq.nlargest(2, candidates)
             
-            print(f"Found {len(log_files)} log files. Most recent: {log_files[0].name}")
+            log.debug("Found %d log files. Most recent: %s", len(candidates), newest[0][1])
             
             # If there's only one log file, it's the current session
-            if len(log_files) < 2:
-                print("No previous session logs found")
+            if len(newest) < 2:
+                log.debug("No previous session logs found")
                 return []
                 
             # Get the second most recent log file (most recent is current session)
-            last_session_log = log_files[1]
-            print(f"Loading context from previous session: {last_session_log.name}")
+            last_session_log = Path(newest[1][1])
+            log.debug("Loading context from previous session: %s", last_session_log.name)
             
             return self._parse_session_log(last_session_log, max_turns)
             
         except Exception as e:
-            print(f"Error loading last session context: {str(e)}")
+            log.warning("Error loading last session context: %s", e)
             return []
     
+    @staticmethod
+    def _read_tail(log_path: Path, max_messages: int) -> str:
+        """
+        Return the end of a log file holding at least max_messages messages.
+        
+        Small files are read whole. Larger ones are read backwards in
+        TAIL_BLOCK_BYTES blocks until enough messages are covered or the start
+        of the file is reached. Only role markers that start a non-empty
+        message are counted, mirroring _parse_log_lines: one with inline
+        content, or followed by a non-blank line before the next marker. A
+        partial first line is dropped.
+        """
+        with open(log_path, 'rb') as f:
+            pos = f.seek(0, os.SEEK_END)
+            if pos <= TAIL_SMALL_FILE_BYTES:
+                f.seek(0)
+                return f.read().decode('utf-8', errors='replace')
+            
+            wanted = max_messages + TAIL_MARKER_SLACK
+            data = b''
+            pending = b''  # Leading bytes whose line may continue in the previous block
+            markers = 0
+            has_content = False  # A non-blank line follows, before the next marker
+            while pos > 0 and markers < wanted:
+                size = min(TAIL_BLOCK_BYTES, pos)
+                pos -= size
+                f.seek(pos)
+                block = f.read(size)
+                data = block + data
+                
+                segment = block + pending
+                pending = b''
+                if pos > 0:
+                    newline = segment.find(b'\n')
+                    pending = segment[:newline + 1] if newline != -1 else segment
+                    segment = segment[newline + 1:] if newline != -1 else b''
+                # Walk complete lines newest-first so each marker knows whether
+                # any content follows it
+                for line in reversed(segment.decode('utf-8', errors='replace').splitlines()):
+                    match = ROLE_MARKER_RE.match(line)
+                    if match:
+                        if has_content or match.group(2):
+                            markers += 1
+                        has_content = False
+                    elif line and not line.isspace():
+                        has_content = True
+        
+        if pos > 0:
+            data = data[data.find(b'\n') + 1:]
+        return data.decode('utf-8', errors='replace')
+    
     def _parse_session_log(self, log_path: Path, max_turns: int) -> List[Dict[str, str]]:
+        max_messages = max_turns * 2
+        
+        try:
+            # The most recent turns live at the end of the file, so only the
+            # tail that covers them is read and parsed
+            text = self._read_tail(log_path, max_messages)
+            messages = self._parse_log_lines(text.splitlines())
+            
+            log.debug("Parsed %d messages from log file", len(messages))
+            
+        except Exception as e:
+            log.warning("Error parsing log file %s: %s", log_path.name, e)
+            return []
+        
+        # Return only the most recent messages up to max_turns * 2 (user + assistant)
+        return messages[-max_messages:] if messages else []
+    
+    def _parse_log_lines(self, lines: Iterable[str]) -> List[Dict[str, str]]:
         messages = []
         current_role = None
-        current_content = []
-        valid_roles = {'user', 'assistant', 'system', 'function', 'tool', 'developer'}
-        message_count = 0
+        current_content = io.StringIO()
         
         def add_message(role: str, content: str) -> None:
-            nonlocal message_count
-            if role in valid_roles and content.strip():
+            # Lines are kept raw while accumulating; strip once here.
+            # Roles come from ROLE_MARKER_RE, so they are always valid.
+            content = content.strip()
+            if content:
                 messages.append({
                     'role': role,
-                    'content': content.strip()
+                    'content': content
                 })
-                message_count += 1
         
-        try:
-            with open(log_path, 'r', encoding='utf-8', errors='replace') as f:
-                for line in f:
-                    line = line.strip()
-                    if not line:
-                        continue
-                    
-                    # Check for role markers (e.g., "USER:", "ASSISTANT:")
-                    if ':' in line:
-                        role_part = line.split(':', 1)[0].strip().lower()
-                        if any(role_part.startswith(role) for role in valid_roles):
-                            # Save previous message if exists
-                            if current_role and current_content:
-                                add_message(current_role, '\n'.join(current_content))
-                                current_content = []
-                                
-                                if message_count >= max_turns * 2:
-                                    break
-                            
-                            current_role = role_part.split()[0]  # Get the base role
-                            content_part = line.split(':', 1)[1].strip()
-                            if content_part:  # Handle content on same line as role
-                                current_content.append(content_part)
-                            continue
-                    
-                    # If we're here, it's a continuation line for the current role
-                    if current_role is not None:
-                        current_content.append(line)
-            
-            # Add the last message if it exists
-            if current_role and current_content:
-                add_message(current_role, '\n'.join(current_content))
+        for line in lines:
+            if not line or line.isspace():
+                continue
             
-            print(f"Parsed {len(messages)} messages from log file")
+            # Check for role markers (e.g., "[timestamp] USER:", "ASSISTANT:")
+            match = ROLE_MARKER_RE.match(line)
+            if match:
+                # Save previous message if exists
+                if current_role and current_content.tell():
+                    add_message(current_role, current_content.getvalue())
+                    current_content = io.StringIO()
+                
+                current_role = match.group(1).lower()
+                content_part = match.group(2)
+                if content_part:  # Handle content on same line as role
+                    current_content.write(content_part)
+                    current_content.write('\n')
+                continue
             
-        except Exception as e:
-            print(f"Error parsing log file {log_path.name}: {str(e)}")
-            return []
+            # If we're here, it's a continuation line for the current role
+            if current_role is not None:
+                current_content.write(line)
+                current_content.write('\n')
         
-        # Return only the most recent messages up to max_turns * 2 (user + assistant)
-        return messages[-(max_turns * 2):] if messages else []
+        # Add the last message if it exists
+        if current_role and current_content.tell():
+            add_message(current_role, current_content.getvalue())
+        
+        return messages
@@ -0,0 +1,31 @@
+from typing import TYPE_CHECKING, Dict, Optional
+
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+# One client per API key so the chat loop and memory summarization share a
+# single connection pool (and warm TLS sessions) for the life of the process.
+_client_cache: Dict[Optional[str], 'OpenAI'] = {}
+
+MAX_CONNECTIONS = 100
+MAX_KEEPALIVE_CONNECTIONS = 20
+TIMEOUT_SECONDS = 60.0
+CONNECT_TIMEOUT_SECONDS = 10.0
+
+
+def get_openai_client(api_key: Optional[str] = None) -> 'OpenAI':
+    """Return the shared OpenAI client for the given API key, creating it on first use."""
+    client = _client_cache.get(api_key)
+    if client is None:
+        # Imported on first use so importing this module stays cheap
+        import httpx
+        from openai import OpenAI
+        
+        http_client = httpx.Client(
+            limits=httpx.Limits(max_connections=MAX_CONNECTIONS,
+                                max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS),
+            timeout=httpx.Timeout(TIMEOUT_SECONDS, connect=CONNECT_TIMEOUT_SECONDS)
+        )
+        client = OpenAI(api_key=api_key, http_client=http_client)
+        _client_cache[api_key] = client
+    return client
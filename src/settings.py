@@ -9,12 +9,15 @@ PROJECT_ROOT = Path(__file__).parent.parent
 
 # Load configuration
 def _deep_update(d, u):
-    """Recursively update dictionary d with values from u."""
-    for k, v in u.items():
-        if isinstance(v, dict):
-            d[k] = _deep_update(d.get(k, {}), v)
-        else:
-            d[k] = v
+    """Deep-merge dictionary u into d in place, using an explicit stack instead of recursion."""
+    stack = [(d, u)]
+    while stack:
+        target, updates = stack.pop()
+        for k, v in updates.items():
+            if isinstance(v, dict) and isinstance(target.get(k), dict):
+                stack.append((target[k], v))
+            else:
+                target[k] = v
     return d
 
 def load_config():
@@ -24,6 +27,8 @@ def load_config():
         'model': 'gpt-4',
         'temperature': 0.7,
         'max_tokens': 2000,
+        'max_history_messages': 40,
+        'history_summary_interval': 10,
         'boot_doc_path': str(PROJECT_ROOT / 'bootdocs' / 'clarity_os_boot_v1.txt')
         # Memory configuration is not included by default
     }
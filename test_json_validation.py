@@ -1,9 +1,18 @@
 import os
+import sys
 import json
+import signal
+import tempfile
+import threading
 import unittest
+from pathlib import Path
 from unittest.mock import MagicMock, patch
 from src.memory_store import MemoryStore
 
+# clarity_chat imports its siblings as top-level modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+import clarity_chat
+
 def mock_openai_response():
     class MockResponse:
         def __init__(self):
@@ -18,14 +27,27 @@ def mock_openai_response():
             })
     return MockResponse()
 
+def session_log_text(entries):
+    # Same layout as ClarityChat.setup_logging/log_message
+    parts = [
+        "=== Session started at 2024-01-01T12:00:00 ===\n"
+        "Boot doc: docs/boot.md\n"
+        "Model: gpt-4 (temp: 0.7)\n"
+        + "-" * 50 + "\n\n"
+    ]
+    for i, (role, content) in enumerate(entries):
+        parts.append(f"[2024-01-01 12:{i // 60:02d}:{i % 60:02d}] {role.upper()}:\n{content}\n\n")
+    return "".join(parts)
+
 class TestMemoryStore(unittest.TestCase):
     def setUp(self):
         self.test_dir = "test_memory"
         os.makedirs(self.test_dir, exist_ok=True)
         self.memory_file = os.path.join(self.test_dir, "long_term.json")
+        self.summary_cache_file = os.path.join(self.test_dir, "summary_cache.json")
         
         # Patch the OpenAI client
-        self.patcher = patch('src.memory_store.OpenAI')
+        self.patcher = patch('openai.OpenAI')
         self.mock_openai = self.patcher.start()
         self.mock_client = MagicMock()
         self.mock_openai.return_value = self.mock_client
@@ -35,8 +57,9 @@ class TestMemoryStore(unittest.TestCase):
 
     def tearDown(self):
         # Cleanup
-        if os.path.exists(self.memory_file):
-            os.remove(self.memory_file)
+        for path in (self.memory_file, self.summary_cache_file):
+            if os.path.exists(path):
+                os.remove(path)
         if os.path.exists(self.test_dir):
             os.rmdir(self.test_dir)
         self.patcher.stop()
@@ -80,5 +103,365 @@ class TestMemoryStore(unittest.TestCase):
         loaded = self.store.load_long_term_memory()
         self.assertEqual(loaded, test_memory, "Loaded memory should match saved memory")
 
+    def test_cached_memory_is_not_shared_with_callers(self):
+        # Test 5: Mutating a loaded memory dict must not leak into later loads
+        test_memory = {
+            'user_profile': 'test user',
+            'preferences': ['test preference'],
+            'work_in_progress': [],
+            'open_loops': [],
+            'last_updated': '2023-01-01T00:00:00.000000'
+        }
+        self.store.save_long_term_memory(test_memory)
+        
+        first = self.store.load_long_term_memory()
+        first['preferences'].append('unsaved preference')
+        
+        second = self.store.load_long_term_memory()
+        self.assertEqual(second['preferences'], ['test preference'])
+
+    def test_save_primes_load_cache(self):
+        # Test 6: A load right after a save is served without re-parsing the file
+        test_memory = {
+            'user_profile': 'test user',
+            'preferences': [],
+            'work_in_progress': [],
+            'open_loops': [],
+            'last_updated': '2023-01-01T00:00:00.000000'
+        }
+        self.store.save_long_term_memory(test_memory)
+        
+        with patch('src.memory_store._loads', side_effect=AssertionError("file was re-parsed")):
+            loaded = self.store.load_long_term_memory()
+        self.assertEqual(loaded['user_profile'], 'test user')
+
+    def test_update_merges_in_order_and_skips_noop_save(self):
+        # Test 7: Merged lists keep first-seen order; unchanged memory is not rewritten
+        self.store.save_long_term_memory({
+            'user_profile': 'test user',
+            'preferences': ['b', 'a', 'test preference'],
+            'work_in_progress': [],
+            'open_loops': [],
+            'last_updated': '2023-01-01T00:00:00.000000'
+        })
+        history = [{'role': 'user', 'content': 'hi'}, {'role': 'assistant', 'content': 'hello'}]
+        
+        self.assertTrue(self.store.update_long_term_memory(history))
+        memory = self.store.load_long_term_memory()
+        self.assertEqual(memory['preferences'], ['b', 'a', 'test preference'])
+        self.assertEqual(memory['work_in_progress'], ['test work'])
+        
+        mtime = os.stat(self.memory_file).st_mtime_ns
+        self.assertIsNone(self.store.update_long_term_memory(history))
+        self.assertEqual(os.stat(self.memory_file).st_mtime_ns, mtime)
+
+    def test_repeated_summary_is_served_from_cache(self):
+        # Test 8: Summarizing the same conversation twice calls the model once
+        history = [{'role': 'user', 'content': 'hi'}, {'role': 'assistant', 'content': 'hello'}]
+        
+        first = self.store.summarize_conversation(history)
+        second = MemoryStore(memory_dir=self.test_dir).summarize_conversation(history)
+        
+        self.assertEqual(self.mock_client.chat.completions.create.call_count, 1)
+        self.assertEqual(first['preferences'], second['preferences'])
+
+    def test_invalid_cached_summary_is_a_miss(self):
+        # Test 9: A corrupt summary cache entry is re-summarized, not merged
+        history = [{'role': 'user', 'content': 'hi'}, {'role': 'assistant', 'content': 'hello'}]
+        with open(self.summary_cache_file, 'w') as f:
+            json.dump({self.store._summary_cache_key(history): {'preferences': 'oops'}}, f)
+        
+        self.assertTrue(self.store.update_long_term_memory(history))
+        self.assertEqual(self.mock_client.chat.completions.create.call_count, 1)
+        self.assertEqual(self.store.load_long_term_memory()['preferences'], ['test preference'])
+    
+    def test_summary_cache_key_covers_prompt(self):
+        # Test 10: Summaries made with a different prompt are not reused
+        history = [{'role': 'user', 'content': 'hi'}, {'role': 'assistant', 'content': 'hello'}]
+        key = self.store._summary_cache_key(history)
+        with patch('src.memory_store.SUMMARY_PROMPT_DIGEST', 'older prompt'):
+            self.assertNotEqual(self.store._summary_cache_key(history), key)
+
+    def test_summary_with_non_string_items_is_rejected(self):
+        # Test 11: A summary that would corrupt the memory file is discarded
+        response = mock_openai_response()
+        response.choices[0].message.content = json.dumps({
+            'user_profile': 'test user',
+            'preferences': [{'name': 'not a string'}],
+            'work_in_progress': [],
+            'open_loops': []
+        })
+        self.mock_client.chat.completions.create.return_value = response
+        
+        history = [{'role': 'user', 'content': 'hi'}, {'role': 'assistant', 'content': 'hello'}]
+        self.assertIsNone(self.store.summarize_conversation(history))
+
+    def test_saving_identical_content_skips_write(self):
+        # Test 12: Re-saving unchanged content leaves the file untouched
+        test_memory = {
+            'user_profile': 'test user',
+            'preferences': ['test preference'],
+            'work_in_progress': [],
+            'open_loops': [],
+            'last_updated': '2023-01-01T00:00:00.000000'
+        }
+        self.assertTrue(self.store.save_long_term_memory(dict(test_memory)))
+        mtime = os.stat(self.memory_file).st_mtime_ns
+        
+        self.assertTrue(self.store.save_long_term_memory(dict(test_memory)))
+        self.assertEqual(os.stat(self.memory_file).st_mtime_ns, mtime)
+        
+        # Changed content is still written
+        test_memory['user_profile'] = 'another user'
+        self.assertTrue(self.store.save_long_term_memory(dict(test_memory)))
+        self.assertEqual(self.store.load_long_term_memory()['user_profile'], 'another user')
+
+    def test_last_session_context_reads_timestamped_log(self):
+        # Test 13: Context comes from the second-newest log, in log_message's format
+        previous = [
+            ('user', 'first question'),
+            ('assistant', 'first answer'),
+            ('user', 'second question'),
+            ('assistant', 'second answer\nspanning two lines'),
+        ]
+        with tempfile.TemporaryDirectory() as logs_dir:
+            for name, entries, mtime in (
+                ('session-2024-01-01-1.txt', [('user', 'too old')], 1_000),
+                ('session-2024-01-01-2.txt', previous, 2_000),
+                ('session-2024-01-01-3.txt', [('user', 'current session')], 3_000),
+            ):
+                path = os.path.join(logs_dir, name)
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write(session_log_text(entries))
+                os.utime(path, (mtime, mtime))
+            
+            messages = self.store.load_last_session_context(logs_dir, max_turns=20)
+            self.assertEqual(messages, [{'role': r, 'content': c} for r, c in previous])
+            
+            # Only the most recent max_turns * 2 messages are kept
+            messages = self.store.load_last_session_context(logs_dir, max_turns=1)
+            self.assertEqual(messages, [{'role': r, 'content': c} for r, c in previous[-2:]])
+
+    def assert_tail_matches_full_parse(self, entries):
+        with tempfile.TemporaryDirectory() as logs_dir:
+            path = os.path.join(logs_dir, 'session-2024-01-01-1.txt')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(session_log_text(entries))
+            with open(path, encoding='utf-8') as f:
+                full_text = f.read()
+            full = self.store._parse_log_lines(full_text.splitlines())
+            
+            # Small, odd block size so blocks split lines and multi-byte characters;
+            # no slack, so a miscounted marker loses a message
+            with patch('src.memory_store.TAIL_BLOCK_BYTES', 37), \
+                 patch('src.memory_store.TAIL_SMALL_FILE_BYTES', 100), \
+                 patch('src.memory_store.TAIL_MARKER_SLACK', 0):
+                for n in (1, 2, 5, 17, 40, 60):
+                    self.assertEqual(
+                        self.store._parse_session_log(Path(path), n), full[-2 * n:], f"max_turns={n}"
+                    )
+                    
+                    # The tail starts on a line boundary and covers no more than it needs
+                    tail = MemoryStore._read_tail(Path(path), 2 * n)
+                    self.assertTrue(full_text.endswith(tail))
+                    self.assertIn(full_text[:-len(tail)][-1:], ('', '\n'))
+                    self.assertEqual(len(self.store._parse_log_lines(tail.splitlines())), min(2 * n, len(full)))
+        return full
+
+    def test_session_log_tail_matches_full_parse(self):
+        # Test 14: Reading the log backwards in blocks yields the same recent messages
+        entries = []
+        for i in range(40):
+            entries.append(('user', f'question {i} — naïve café ☕ ' * (i % 5 + 1)))
+            entries.append(('assistant', f'answer {i}\nline two 日本語 {i}\n\nline four ' + 'x' * (i * 3)))
+        
+        self.assertEqual(len(self.assert_tail_matches_full_parse(entries)), 80)
+
+    def test_session_log_tail_skips_empty_messages(self):
+        # Test 15: Markers that produce no message don't count towards the tail
+        entries = []
+        for i in range(40):
+            entries.append(('user', f'question {i} ☕'))
+            if i % 3 == 0:
+                entries.append(('assistant', ''))  # Empty reply
+            elif i % 3 == 1:
+                # Reply opening with a role marker leaves the header marker empty
+                entries.append(('assistant', f'System:\nnot a real header {i}'))
+            else:
+                entries.append(('assistant', f'answer {i}\n日本語'))
+        
+        full = self.assert_tail_matches_full_parse(entries)
+        self.assertEqual(len(full), 40 + 26)
+
+    def test_modify_holds_lock_against_background_update(self):
+        # Test 16: A summary merged during a /memory edit is not overwritten by it
+        history = [{'role': 'user', 'content': 'hi'}, {'role': 'assistant', 'content': 'hello'}]
+        
+        started = []
+        
+        def add_preference(memory):
+            background = threading.Thread(target=self.store.update_long_term_memory, args=(history,))
+            background.start()
+            started.append(background)
+            background.join(timeout=0.2)
+            self.assertTrue(background.is_alive(), "background update should wait for the lock")
+            memory['preferences'].append('typed preference')
+            return True
+        
+        self.assertTrue(self.store.modify_long_term_memory(add_preference))
+        started[0].join()
+        
+        memory = self.store.load_long_term_memory()
+        self.assertEqual(memory['preferences'], ['typed preference', 'test preference'])
+        
+        # Nothing changed: nothing saved
+        self.assertFalse(self.store.modify_long_term_memory(lambda memory: False))
+
+class TestClarityChatSummaries(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        boot_doc = os.path.join(self.tmp.name, 'boot.txt')
+        with open(boot_doc, 'w') as f:
+            f.write('boot')
+        self.config = {
+            'model': 'gpt-4',
+            'temperature': 0.7,
+            'max_tokens': 2000,
+            'max_history_messages': 40,
+            'history_summary_interval': 10,
+            'boot_doc_path': boot_doc,
+            'memory': {
+                'enable_long_term_memory': True,
+                'enable_last_session_context': False,
+                'background_summary_turns': 99,
+            },
+        }
+        self.client = MagicMock()
+        self.fail_turns = set()
+        self.turns = 0
+        self.client.chat.completions.create.side_effect = self.stream_reply
+        
+        self.cwd = os.getcwd()
+        os.chdir(self.tmp.name)  # MemoryStore writes to ./memory
+        self.sigint = signal.getsignal(signal.SIGINT)
+        self.chat = None
+    
+    def tearDown(self):
+        if self.chat is not None:
+            self.chat.close_log()
+            self.chat._summary_executor.shutdown()
+            clarity_chat.logging.getLogger(clarity_chat.MemoryStore.__module__).removeHandler(self.chat._summary_log)
+        signal.signal(signal.SIGINT, self.sigint)
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+    
+    def stream_reply(self, **kwargs):
+        self.turns += 1
+        if self.turns in self.fail_turns:
+            raise RuntimeError('request failed')
+        delta = MagicMock()
+        delta.choices[0].delta.content = f'reply {self.turns}'
+        return iter([delta])
+    
+    def make_chat(self):
+        with patch.object(clarity_chat, 'load_config', return_value=self.config), \
+             patch.object(clarity_chat, 'get_api_key', return_value='test-key'), \
+             patch.object(clarity_chat, 'get_openai_client', return_value=self.client), \
+             patch.object(clarity_chat, 'LOGS_DIR', Path(self.tmp.name)), \
+             patch('builtins.print'):
+            self.chat = clarity_chat.ClarityChat()
+        store = self.chat.memory_store
+        store.update_long_term_memory = MagicMock(return_value=True)
+        store.summarize_conversation = MagicMock(side_effect=lambda history: {
+            'user_profile': '',
+            'preferences': [m['content'] for m in history],
+            'work_in_progress': [],
+            'open_loops': [],
+        })
+        return self.chat
+    
+    def turn(self, text):
+        # What ClarityChat.run does for a chat message
+        chat = self.chat
+        ''.join(chat.get_chat_response(text))
+        chat._schedule_background_summary()
+        chat._schedule_history_summary()
+        for future in (chat._pending_summary, chat._pending_history_summary):
+            if future is not None:
+                future.result(timeout=5)
+    
+    @staticmethod
+    def contents(call):
+        return [m['content'] for m in call.args[0]]
+    
+    def test_memory_batches_start_at_recorded_index(self):
+        # A failed turn only appends the user message; the next batch must not overlap
+        self.config['memory']['background_summary_turns'] = 2
+        self.fail_turns = {3}
+        chat = self.make_chat()
+        
+        for i in range(1, 5):
+            self.turn(f'question {i}')
+        
+        calls = chat.memory_store.update_long_term_memory.call_args_list
+        self.assertEqual([self.contents(c) for c in calls], [
+            ['question 1', 'reply 1', 'question 2', 'reply 2'],
+            ['question 3', 'question 4', 'reply 4'],
+        ])
+        self.assertEqual(chat._summary_start, len(chat.conversation_history))
+    
+    def test_history_summary_waits_for_full_batch(self):
+        # Dropped messages are summarized only once history_summary_interval have piled up
+        self.config['max_history_messages'] = 4
+        self.config['history_summary_interval'] = 3
+        self.fail_turns = {2}
+        chat = self.make_chat()
+        summarize = chat.memory_store.summarize_conversation
+        
+        self.turn('question 1')
+        self.turn('question 2')
+        self.turn('question 3')  # 5 messages, 1 dropped
+        summarize.assert_not_called()
+        
+        self.turn('question 4')  # 7 messages, 3 dropped
+        self.assertEqual([self.contents(c) for c in summarize.call_args_list], [
+            ['question 1', 'reply 1', 'question 2'],
+        ])
+        
+        self.turn('question 5')  # 9 messages, 2 more dropped
+        self.assertEqual(summarize.call_count, 1)
+        self.turn('question 6')  # 11 messages, 4 more dropped
+        self.assertEqual(self.contents(summarize.call_args_list[1]),
+                         ['question 3', 'reply 3', 'question 4', 'reply 4'])
+        self.assertEqual(chat._summarized_upto, 7)
+        
+        # Finished summaries are folded in and sent ahead of the recent messages
+        window = chat._windowed_history()
+        self.assertEqual(len(window), 5)
+        self.assertIn('question 1; reply 1; question 2; question 3', window[0]['content'])
+        self.assertEqual(window[1:], chat.conversation_history[-4:])
+    
+    def test_reset_clears_summary_indexes(self):
+        self.config['memory']['background_summary_turns'] = 2
+        self.config['max_history_messages'] = 2
+        self.config['history_summary_interval'] = 2
+        chat = self.make_chat()
+        for i in range(1, 3):
+            self.turn(f'question {i}')
+        self.assertEqual((chat._summary_start, chat._summarized_upto), (4, 2))
+        
+        with patch('builtins.print'):
+            chat._commands['/reset']()
+        self.assertEqual((chat._summary_start, chat._summarized_upto), (0, 0))
+        self.assertIsNone(chat._rolling_summary)
+        self.assertIsNone(chat._pending_history_summary)
+        
+        self.turn('question 3')
+        self.turn('question 4')
+        calls = chat.memory_store.update_long_term_memory.call_args_list
+        self.assertEqual(self.contents(calls[-1]), ['question 3', 'reply 3', 'question 4', 'reply 4'])
+        self.assertEqual(self.contents(chat.memory_store.summarize_conversation.call_args_list[-1]),
+                         ['question 3', 'reply 3'])
+
 if __name__ == "__main__":
     unittest.main()